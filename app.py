@@ -2,51 +2,17 @@
 AI Knowledge Bot for Confluence - Main Application
 Run this file to start the Confluence knowledge bot
 """
+import asyncio
 import sys
-import threading
-import time
-from confluence_agent import ask, test_connection
+from confluence_agent import ask_stream_async, test_connection
 
-# Loading spinner class
-class LoadingSpinner:
-    """Simple loading spinner for terminal"""
-    def __init__(self, message="Thinking"):
-        self.message = message
-        self.spinner_chars = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
-        self.spinner_index = 0
-        self.running = False
-        self.thread = None
-    
-    def _spin(self):
-        """Internal spinner animation"""
-        while self.running:
-            char = self.spinner_chars[self.spinner_index]
-            sys.stdout.write(f'\r🤖 Bot: {char} {self.message}...')
-            sys.stdout.flush()
-            self.spinner_index = (self.spinner_index + 1) % len(self.spinner_chars)
-            time.sleep(0.1)
-    
-    def start(self):
-        """Start the spinner"""
-        self.running = True
-        self.thread = threading.Thread(target=self._spin, daemon=True)
-        self.thread.start()
-    
-    def stop(self):
-        """Stop the spinner"""
-        self.running = False
-        if self.thread:
-            self.thread.join()
-        sys.stdout.write('\r' + ' ' * 60 + '\r')  # Clear the spinner line
-        sys.stdout.flush()
-
-def main():
+async def main():
     print("🤖 AI Knowledge Bot for Internal Docs")
     print("=" * 50)
     
     # Test connection
     print("\nTesting Confluence connection...")
-    if test_connection():
+    if await asyncio.to_thread(test_connection):
         print("✅ Connected to Confluence successfully!")
     else:
         print("❌ Failed to connect to Confluence.")
@@ -67,6 +33,10 @@ def main():
     
     while True:
         try:
+            # Read input on the main thread: nothing else runs while we
+            # wait for the user, and this keeps Ctrl-C raising
+            # KeyboardInterrupt right here instead of stranding a worker
+            # thread in input()
             query = input("You: ").strip()
             if query.lower() in ['exit', 'quit', 'q']:
                 print("\nGoodbye! 👋")
@@ -75,17 +45,16 @@ def main():
             if not query:
                 continue
             
-            # Show loading spinner
-            spinner = LoadingSpinner("Thinking")
-            spinner.start()
-            
+            # Stream the response as it is generated; the first token
+            # arrives fast enough that no spinner is needed
             try:
-                response = ask(query)
-                spinner.stop()
-                print("🤖 Bot:", response)
-                print()
+                sys.stdout.write("🤖 Bot: ")
+                sys.stdout.flush()
+                async for chunk in ask_stream_async(query):
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                print("\n")
             except Exception as e:
-                spinner.stop()
                 print(f"\n⚠️ Error: {e}\n")
             
         except KeyboardInterrupt:
@@ -95,5 +64,8 @@ def main():
             print(f"\n⚠️ Error: {e}\n")
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n\nGoodbye! 👋")
 
@@ -2,6 +2,9 @@
 AI Knowledge Bot for Confluence
 Main agent that orchestrates all tools and capabilities
 """
+import asyncio
+import html
+import io
 import os
 import re
 from typing import List, Dict
@@ -12,9 +15,26 @@ from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from confluence_connector import ConfluenceConnector
+from semantic_cache import get_semantic_cache
+
+try:
+    # C-backed HTML parser, much faster than regex stripping on large bodies
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    # BM25 ranking to keep only query-relevant passages in LLM prompts
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
 
 load_dotenv()
 
+# Precompiled patterns for clean_html (called in hot loops on large bodies)
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
 # Initialize Confluence connector
 def get_confluence_connector() -> ConfluenceConnector:
     """Get initialized Confluence connector from environment variables"""
@@ -40,8 +60,20 @@ def get_confluence():
         confluence = get_confluence_connector()
     return confluence
 
-# Initialize LLM
-llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
+# Semantic cache (will be created when needed)
+semantic_cache = None
+
+def get_cache():
+    """Lazy initialization of the semantic cache"""
+    global semantic_cache
+    if semantic_cache is None:
+        semantic_cache = get_semantic_cache()
+    return semantic_cache
+
+# Initialize LLM (shared by the agent and all tools so the underlying
+# HTTPS connection is reused instead of re-opened per call)
+llm = ChatOpenAI(temperature=0, model="gpt-4o-mini", streaming=True,
+                 max_retries=3)
 
 # Tool: Search Confluence
 @tool
@@ -72,7 +104,9 @@ def search_confluence(query: str) -> str:
                 f"- Ensure you have access to the Confluence space"
             )
         
-        formatted_results = []
+        # Build the output in one buffer instead of a string per result
+        buf = io.StringIO()
+        buf.write(f"Found {len(results)} results for '{query}':\n\n")
         for i, result in enumerate(results, 1):
             excerpt = result.get('excerpt', 'No excerpt available')
             if not excerpt or excerpt == 'No excerpt available':
@@ -80,16 +114,16 @@ def search_confluence(query: str) -> str:
                 body = result.get('body', '')
                 if body:
                     excerpt = clean_html(body)[:200] + "..."
-            
-            formatted_results.append(
+
+            buf.write(
                 f"[{i}] {result['title']}\n"
                 f"   Space: {result['space']}\n"
                 f"   URL: {result['url']}\n"
                 f"   Content ID: {result['id']}\n"
-                f"   Excerpt: {excerpt[:200]}...\n"
+                f"   Excerpt: {excerpt[:200]}...\n\n"
             )
-        
-        return f"Found {len(results)} results for '{query}':\n\n" + "\n".join(formatted_results)
+
+        return buf.getvalue().rstrip('\n')
     except Exception as e:
         return f"Error searching Confluence: {str(e)}"
 
@@ -160,8 +194,10 @@ Content: {body_text[:3000]}  # Limit input to avoid token limits
 
 Summary:"""
             
-            summary_llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
-            summary = summary_llm.invoke(summary_prompt).content
+            # Cap decoding to roughly the requested summary size; the
+            # model default would let it generate far past max_length
+            summary_tokens = max(64, max_length // 4)
+            summary = llm.bind(max_tokens=summary_tokens).invoke(summary_prompt).content
         else:
             summary = body_text[:max_length]
         
@@ -196,16 +232,18 @@ def search_by_title(title_query: str) -> str:
         if not results:
             return f"No pages found with title matching: '{title_query}'"
         
-        formatted_results = []
+        # Build the output in one buffer instead of a string per result
+        buf = io.StringIO()
+        buf.write(f"Found {len(results)} pages with title matching '{title_query}':\n\n")
         for i, result in enumerate(results, 1):
-            formatted_results.append(
+            buf.write(
                 f"[{i}] {result['title']}\n"
                 f"   Space: {result['space']}\n"
                 f"   URL: {result['url']}\n"
-                f"   Content ID: {result['id']}\n"
+                f"   Content ID: {result['id']}\n\n"
             )
-        
-        return f"Found {len(results)} pages with title matching '{title_query}':\n\n" + "\n".join(formatted_results)
+
+        return buf.getvalue().rstrip('\n')
     except Exception as e:
         return f"Error searching by title: {str(e)}"
 
@@ -234,16 +272,16 @@ def answer_with_citations(query: str) -> str:
         context = []
         citations = []
         
-        for result in results:
-            # Get full content for better context
-            full_doc = connector.get_content_by_id(result['id'])
-            if full_doc:
-                body_text = clean_html(full_doc.get("body", ""))[:2000]  # Limit length
-                context.append(f"Title: {full_doc['title']}\nContent: {body_text}")
-                citations.append({
-                    "title": full_doc['title'],
-                    "url": full_doc['url']
-                })
+        # Get full content for better context, fetched in one concurrent batch
+        full_docs = connector.get_content_by_ids([result['id'] for result in results])
+        for full_doc in full_docs:
+            # Keep only the passages most relevant to the query
+            body_text = select_passages(query, clean_html(full_doc.get("body", "")))
+            context.append(f"Title: {full_doc['title']}\nContent: {body_text}")
+            citations.append({
+                "title": full_doc['title'],
+                "url": full_doc['url']
+            })
         
         # Use LLM to generate answer from context
         answer_prompt = f"""Based on the following Confluence documents, answer the user's question.
@@ -260,8 +298,7 @@ Answer the question using information from these documents. At the end, list all
 
 Answer:"""
         
-        answer_llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
-        answer = answer_llm.invoke(answer_prompt).content
+        answer = llm.invoke(answer_prompt).content
         
         # Ensure citations are included
         if not any(citation['url'] in answer for citation in citations):
@@ -296,11 +333,10 @@ def suggest_actions(query: str, context: str = "") -> str:
         
         context_text = ""
         if results:
-            for result in results:
-                doc = connector.get_content_by_id(result['id'])
-                if doc:
-                    body_text = clean_html(doc.get("body", ""))[:1500]
-                    context_text += f"\n\nDocument: {doc['title']}\n{body_text}"
+            docs = connector.get_content_by_ids([result['id'] for result in results])
+            for doc in docs:
+                body_text = clean_html(doc.get("body", ""))[:1500]
+                context_text += f"\n\nDocument: {doc['title']}\n{body_text}"
         
         if context:
             context_text = context + context_text
@@ -318,34 +354,60 @@ Provide suggestions in a numbered list format. Each suggestion should be:
 
 Suggestions:"""
         
-        action_llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
-        suggestions = action_llm.invoke(action_prompt).content
+        # A short numbered list never needs more than a few hundred tokens
+        suggestions = llm.bind(max_tokens=300).invoke(action_prompt).content
         
         return suggestions
     except Exception as e:
         return f"Error generating suggestions: {str(e)}"
 
+# Helper function to keep only the most relevant passages of a document
+def select_passages(query: str, text: str, passage_size: int = 500,
+                    top_k: int = 3) -> str:
+    """
+    Rank fixed-size passages of a document against the query and keep the
+    top ones, so LLM prompts carry relevant context instead of the first
+    N characters. Uses BM25 when available, keyword overlap otherwise.
+    """
+    if len(text) <= passage_size * top_k:
+        return text
+
+    passages = [text[i:i + passage_size]
+                for i in range(0, len(text), passage_size)]
+    query_tokens = query.lower().split()
+
+    if BM25Okapi is not None:
+        bm25 = BM25Okapi([passage.lower().split() for passage in passages])
+        scores = list(bm25.get_scores(query_tokens))
+    else:
+        query_set = set(query_tokens)
+        scores = [sum(1 for token in passage.lower().split() if token in query_set)
+                  for passage in passages]
+
+    top_indices = sorted(range(len(passages)),
+                         key=lambda i: scores[i], reverse=True)[:top_k]
+    # Preserve document order so the stitched context reads naturally
+    return " ... ".join(passages[i] for i in sorted(top_indices))
+
 # Helper function to clean HTML
 def clean_html(html_text: str) -> str:
     """Remove HTML tags and decode entities"""
     if not html_text:
         return ""
-    
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', html_text)
-    
-    # Decode common HTML entities
-    text = text.replace('&nbsp;', ' ')
-    text = text.replace('&amp;', '&')
-    text = text.replace('&lt;', '<')
-    text = text.replace('&gt;', '>')
-    text = text.replace('&quot;', '"')
-    text = text.replace('&#39;', "'")
-    
+
+    if HTMLParser is not None:
+        # selectolax strips tags and decodes entities in one C pass
+        text = HTMLParser(html_text).text(separator=' ')
+    else:
+        # Fallback: remove HTML tags with regex, then decode all named and
+        # numeric entities in one C pass
+        text = _TAG_RE.sub('', html_text)
+        text = html.unescape(text)
+
     # Clean up whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = _WS_RE.sub(' ', text)
     text = text.strip()
-    
+
     return text
 
 # Create agent with all tools
@@ -403,13 +465,120 @@ def ask(question: str) -> str:
         Bot's response
     """
     try:
+        cache = get_cache()
+        cached_response = cache.get(question)
+        if cached_response is not None:
+            return cached_response
+
         response = agent.invoke({
             "messages": [HumanMessage(content=question)]
         })
-        return response["messages"][-1].content
+        answer = response["messages"][-1].content
+        cache.set(question, answer)
+        return answer
     except Exception as e:
         return f"Error: {str(e)}"
 
+def ask_stream(question: str):
+    """
+    Ask the bot a question and stream the response token by token
+
+    Args:
+        question: User's question
+
+    Yields:
+        Response text chunks as they are generated
+    """
+    try:
+        cache = get_cache()
+        cached_response = cache.get(question)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        answer_parts = []
+        for chunk, metadata in agent.stream(
+            {"messages": [HumanMessage(content=question)]},
+            stream_mode="messages"
+        ):
+            # Only surface tokens from the agent's own responses, not from
+            # LLM calls made inside tools
+            if metadata.get("langgraph_node") == "tools":
+                continue
+            text = getattr(chunk, "content", "")
+            if text and isinstance(text, str):
+                answer_parts.append(text)
+                yield text
+
+        if answer_parts:
+            cache.set(question, "".join(answer_parts))
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+async def ask_async(question: str) -> str:
+    """
+    Async variant of ask(). The agent runs on the event loop and
+    dispatches tool calls to worker threads, so parallel tool
+    invocations overlap their Confluence/OpenAI I/O.
+
+    Args:
+        question: User's question
+
+    Returns:
+        Bot's response
+    """
+    try:
+        cache = get_cache()
+        cached_response = await asyncio.to_thread(cache.get, question)
+        if cached_response is not None:
+            return cached_response
+
+        response = await agent.ainvoke({
+            "messages": [HumanMessage(content=question)]
+        })
+        answer = response["messages"][-1].content
+        await asyncio.to_thread(cache.set, question, answer)
+        return answer
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def ask_stream_async(question: str):
+    """
+    Async variant of ask_stream(): streams response tokens without
+    blocking the event loop between chunks.
+
+    Args:
+        question: User's question
+
+    Yields:
+        Response text chunks as they are generated
+    """
+    try:
+        cache = get_cache()
+        cached_response = await asyncio.to_thread(cache.get, question)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        answer_parts = []
+        async for chunk, metadata in agent.astream(
+            {"messages": [HumanMessage(content=question)]},
+            stream_mode="messages"
+        ):
+            # Only surface tokens from the agent's own responses, not from
+            # LLM calls made inside tools
+            if metadata.get("langgraph_node") == "tools":
+                continue
+            text = getattr(chunk, "content", "")
+            if text and isinstance(text, str):
+                answer_parts.append(text)
+                yield text
+
+        if answer_parts:
+            await asyncio.to_thread(cache.set, question, "".join(answer_parts))
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
 def test_connection() -> bool:
     """Test Confluence connection"""
     try:
@@ -2,10 +2,42 @@
 Confluence Connector Module
 Handles all interactions with Confluence API
 """
+import operator
 import os
+import threading
 import requests
+from cachetools import TTLCache, cachedmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
 from urllib.parse import quote
+from urllib3.util.retry import Retry
+
+try:
+    # Rust-backed JSON decoder, noticeably faster on large Confluence payloads
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # HTTP cache with ETag/Last-Modified conditional GETs: repeat content
+    # reads become cheap 304s instead of full document transfers
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+
+def _parse_json(response) -> Dict:
+    """Decode a JSON response body with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _cql_escape(s: str) -> str:
+    """Escape backslashes and quotes so user text is safe inside a quoted
+    CQL string (an unescaped quote makes the whole query a 400)"""
+    return s.replace('\\', '\\\\').replace('"', '\\"')
 
 
 class ConfluenceConnector:
@@ -25,7 +57,51 @@ class ConfluenceConnector:
         self.api_token = api_token
         self.auth = (username, api_token)
         self.api_base = f"{self.base_url}/wiki/rest/api"
-        
+
+        # Persistent session with pooled keep-alive connections so repeated
+        # API calls reuse one TCP+TLS connection instead of re-handshaking.
+        # When requests-cache is installed the session also caches responses
+        # on disk and revalidates them with conditional GETs.
+        if requests_cache is not None:
+            self.session = requests_cache.CachedSession(
+                'confluence_cache',
+                backend='sqlite',
+                expire_after=600,
+                cache_control=True
+            )
+        else:
+            self.session = requests.Session()
+        self.session.auth = self.auth
+        # Exponential backoff on throttling/server errors so a transient
+        # 429/5xx retries instead of surfacing as an empty search result
+        retry_kwargs = dict(
+            total=4,
+            backoff_factor=0.4,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+        try:
+            retries = Retry(backoff_jitter=0.3, **retry_kwargs)
+        except TypeError:
+            # urllib3 < 2 has no backoff_jitter
+            retries = Retry(**retry_kwargs)
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=retries
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Short-lived caches so repeat lookups (e.g. "summarize X" followed
+        # by "get X") skip the Confluence round trip entirely. Per-instance,
+        # so a reconnect with new credentials starts clean.
+        self._search_cache = TTLCache(maxsize=1024, ttl=300)
+        self._content_cache = TTLCache(maxsize=1024, ttl=300)
+        self._cache_lock = threading.RLock()
+
+    @cachedmethod(operator.attrgetter('_search_cache'),
+                  lock=operator.attrgetter('_cache_lock'))
     def search_content(self, query: str, limit: int = 10) -> List[Dict]:
         """
         Search for content in Confluence using multiple strategies
@@ -39,83 +115,86 @@ class ConfluenceConnector:
         """
         all_results = []
         seen_ids = set()
-        
-        # Strategy 1: Title search (most specific) - try exact match first
-        title_results = self._search_by_title(query, limit)
-        for result in title_results:
-            if result["id"] not in seen_ids:
-                all_results.append(result)
-                seen_ids.add(result["id"])
-        
-        # Strategy 2: Title search with individual keywords (for long titles)
-        if len(all_results) < limit:
-            title_keywords = [word.strip() for word in query.split() if len(word.strip()) > 2]
-            if len(title_keywords) > 1:
-                for keyword in title_keywords[:3]:  # Try first 3 keywords
-                    keyword_title_results = self._search_cql(f'title ~ "{keyword}"', limit)
-                    for result in keyword_title_results:
-                        if result["id"] not in seen_ids:
-                            all_results.append(result)
-                            seen_ids.add(result["id"])
-        
-        # Strategy 3: CQL text search with exact phrase
-        if len(all_results) < limit:
-            cql_results = self._search_cql(f'text ~ "{query}"', limit)
-            for result in cql_results:
-                if result["id"] not in seen_ids:
-                    all_results.append(result)
-                    seen_ids.add(result["id"])
-        
-        # Strategy 4: CQL title search (redundant but ensures coverage)
-        if len(all_results) < limit:
-            cql_title_results = self._search_cql(f'title ~ "{query}"', limit)
-            for result in cql_title_results:
-                if result["id"] not in seen_ids:
-                    all_results.append(result)
-                    seen_ids.add(result["id"])
-        
-        # Strategy 5: Break query into keywords and search in text
-        if len(all_results) < limit:
-            keywords = [word.strip() for word in query.split() if len(word.strip()) > 2]
-            if keywords:
-                keyword_query = " OR ".join([f'text ~ "{kw}"' for kw in keywords[:3]])
-                keyword_results = self._search_cql(f"({keyword_query})", limit)
-                for result in keyword_results:
+
+        # Escape and tokenize once; every strategy formats from these
+        q = _cql_escape(query)
+        keywords = self._tokenize(q)
+
+        # Build all CQL strategy queries upfront so they can run concurrently:
+        # 1. Title search (most specific)
+        cql_queries = [f'title ~ "{q}"']
+
+        # 2. Title search with individual keywords (for long titles)
+        if len(keywords) > 1:
+            for keyword in keywords:
+                cql_queries.append(f'title ~ "{keyword}"')
+
+        # 3. CQL text search with exact phrase
+        cql_queries.append(f'text ~ "{q}"')
+
+        # 4. Break query into keywords and search in text
+        if keywords:
+            keyword_query = " OR ".join([f'text ~ "{kw}"' for kw in keywords])
+            cql_queries.append(f"({keyword_query})")
+
+        # Fire all strategies concurrently and merge-dedupe as they complete,
+        # so total latency is one round trip instead of one per strategy
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = [
+                executor.submit(self._search_cql, cql, limit)
+                for cql in cql_queries
+            ]
+            for future in as_completed(futures):
+                for result in future.result():
                     if result["id"] not in seen_ids:
                         all_results.append(result)
                         seen_ids.add(result["id"])
-        
-        # Strategy 6: Use REST API content search (fallback)
+                if len(all_results) >= limit:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        # Fallback: REST API content search, only if still short on results
         if len(all_results) < limit:
             rest_results = self._search_rest_api(query, limit)
             for result in rest_results:
                 if result["id"] not in seen_ids:
                     all_results.append(result)
                     seen_ids.add(result["id"])
-        
+
         return all_results[:limit]
     
+    @staticmethod
+    def _tokenize(query: str) -> List[str]:
+        """Split a query into its first few significant keywords"""
+        return [word.strip() for word in query.split() if len(word.strip()) > 2][:3]
+
     def search_by_title(self, query: str, limit: int = 10) -> List[Dict]:
         """Search by title using CQL - public method"""
-        return self._search_cql(f'title ~ "{query}"', limit)
-    
+        return self._search_cql(f'title ~ "{_cql_escape(query)}"', limit)
+
     def _search_by_title(self, query: str, limit: int = 10) -> List[Dict]:
         """Search by title using CQL - internal method"""
-        return self._search_cql(f'title ~ "{query}"', limit)
+        return self._search_cql(f'title ~ "{_cql_escape(query)}"', limit)
     
     def _search_cql(self, cql_query: str, limit: int = 10) -> List[Dict]:
         """Search using CQL query"""
-        url = f"{self.api_base}/content/search"
+        # The search endpoint (not content/search) returns highlighted
+        # excerpts on each hit, so search results keep a content preview
+        # without expanding full bodies; full text comes from
+        # get_content_by_id
+        url = f"{self.api_base}/search"
         params = {
             "cql": cql_query,
             "limit": limit,
-            "expand": "space,version,body.storage"
+            "expand": "content.space,content.version",
+            "excerpt": "highlight"
         }
         
         try:
-            response = requests.get(url, auth=self.auth, params=params)
+            response = self.session.get(url, params=params, timeout=(3, 10))
             response.raise_for_status()
-            results = response.json().get("results", [])
+            results = _parse_json(response).get("results", [])
             return self._format_results(results)
         except requests.exceptions.HTTPError as e:
             # Log HTTP errors for debugging but don't fail completely
@@ -128,18 +207,20 @@ class ConfluenceConnector:
             return []
     
     def _search_rest_api(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search using REST API content endpoint"""
-        url = f"{self.api_base}/content/search"
+        """Search using REST API search endpoint"""
+        url = f"{self.api_base}/search"
+        q = _cql_escape(query)
         params = {
-            "cql": f'text ~ "{query}" OR title ~ "{query}"',
+            "cql": f'text ~ "{q}" OR title ~ "{q}"',
             "limit": limit,
-            "expand": "space,version,body.storage"
+            "expand": "content.space,content.version",
+            "excerpt": "highlight"
         }
         
         try:
-            response = requests.get(url, auth=self.auth, params=params)
+            response = self.session.get(url, params=params, timeout=(3, 10))
             response.raise_for_status()
-            results = response.json().get("results", [])
+            results = _parse_json(response).get("results", [])
             return self._format_results(results)
         except Exception as e:
             return []
@@ -148,17 +229,25 @@ class ConfluenceConnector:
         """Format search results"""
         formatted_results = []
         for item in results:
+            # /rest/api/search wraps the content object and carries the
+            # excerpt on the wrapper, with matches marked up as
+            # @@@hl@@@...@@@endhl@@@
+            content = item.get("content", item)
+            excerpt = item.get("excerpt", "")
+            excerpt = excerpt.replace("@@@hl@@@", "").replace("@@@endhl@@@", "")
             formatted_results.append({
-                "id": item.get("id"),
-                "title": item.get("title"),
-                "url": f"{self.base_url}{item.get('_links', {}).get('webui', '')}",
-                "space": item.get("space", {}).get("name", "Unknown"),
-                "type": item.get("type", "page"),
-                "excerpt": item.get("excerpt", ""),
-                "body": item.get("body", {}).get("storage", {}).get("value", "")
+                "id": content.get("id"),
+                "title": content.get("title"),
+                "url": f"{self.base_url}{content.get('_links', {}).get('webui', '')}",
+                "space": content.get("space", {}).get("name", "Unknown"),
+                "type": content.get("type", "page"),
+                "excerpt": excerpt,
+                "body": content.get("body", {}).get("storage", {}).get("value", "")
             })
         return formatted_results
     
+    @cachedmethod(operator.attrgetter('_content_cache'),
+                  lock=operator.attrgetter('_cache_lock'))
     def get_content_by_id(self, content_id: str) -> Optional[Dict]:
         """
         Retrieve specific content by ID
@@ -175,9 +264,9 @@ class ConfluenceConnector:
         }
         
         try:
-            response = requests.get(url, auth=self.auth, params=params)
+            response = self.session.get(url, params=params, timeout=(3, 10))
             response.raise_for_status()
-            item = response.json()
+            item = _parse_json(response)
             
             return {
                 "id": item.get("id"),
@@ -193,6 +282,27 @@ class ConfluenceConnector:
             print(f"Error retrieving content: {e}")
             return None
     
+    def get_content_by_ids(self, content_ids: List[str]) -> List[Dict]:
+        """
+        Retrieve multiple content items by ID concurrently
+
+        Args:
+            content_ids: List of Confluence content IDs
+
+        Returns:
+            List of content dictionaries in the same order as the input,
+            with items that could not be fetched omitted
+        """
+        if not content_ids:
+            return []
+
+        # Fetches are network-bound, so run them in parallel over the
+        # pooled session instead of one round trip per document
+        with ThreadPoolExecutor(max_workers=min(len(content_ids), 10)) as executor:
+            docs = list(executor.map(self.get_content_by_id, content_ids))
+
+        return [doc for doc in docs if doc]
+
     def get_space_content(self, space_key: str, limit: int = 50) -> List[Dict]:
         """
         Get all content from a specific space
@@ -212,9 +322,9 @@ class ConfluenceConnector:
         }
         
         try:
-            response = requests.get(url, auth=self.auth, params=params)
+            response = self.session.get(url, params=params, timeout=(3, 10))
             response.raise_for_status()
-            results = response.json().get("results", [])
+            results = _parse_json(response).get("results", [])
             
             formatted_results = []
             for item in results:
@@ -235,7 +345,7 @@ class ConfluenceConnector:
         """Test if the connection to Confluence is working"""
         try:
             url = f"{self.api_base}/user/current"
-            response = requests.get(url, auth=self.auth)
+            response = self.session.get(url, timeout=(3, 10))
             response.raise_for_status()
             return True
         except Exception as e:
@@ -0,0 +1,167 @@
+"""
+Semantic Cache Module
+Caches bot responses keyed by sentence-embedding similarity so that
+paraphrased repeats of earlier questions are answered without re-running
+the agent (no OpenAI or Confluence round trips on a hit).
+"""
+import functools
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from typing import Optional
+from langchain_openai import OpenAIEmbeddings
+
+# Single shared embeddings client so every lookup reuses one HTTPS
+# connection to the OpenAI API instead of opening a fresh one
+_embeddings = None
+
+def _get_embeddings() -> OpenAIEmbeddings:
+    """Lazy initialization of the shared embeddings client"""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    return _embeddings
+
+def _normalize(question: str) -> str:
+    """Normalize a question so trivial variants share one embedding"""
+    return re.sub(r'\s+', ' ', question.strip().lower())
+
+@functools.lru_cache(maxsize=4096)
+def _embed_query(normalized_question: str) -> tuple:
+    """Embed a normalized question, memoized so exact repeats skip the API"""
+    return tuple(_get_embeddings().embed_query(normalized_question))
+
+
+class SemanticCache:
+    """SQLite-backed cache of (question embedding, response) pairs.
+
+    Lookups embed the incoming question and return the stored response of
+    the nearest cached question if its cosine similarity exceeds the
+    threshold and the entry has not expired. Entries are namespaced (e.g.
+    by Confluence workspace) so similar questions against different
+    workspaces never share answers.
+    """
+
+    def __init__(self, db_path: str = "semantic_cache.db",
+                 similarity_threshold: float = 0.85,
+                 ttl: int = 3600,
+                 namespace: str = "default"):
+        """
+        Initialize the semantic cache
+
+        Args:
+            db_path: Path to the SQLite database file
+            similarity_threshold: Minimum cosine similarity for a cache hit
+            ttl: Time-to-live for cached entries in seconds
+            namespace: Key prefix isolating entries (e.g. per Confluence site)
+        """
+        self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.namespace = namespace
+        self._init_db()
+
+    def _init_db(self):
+        """Create the cache table if it doesn't exist"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS semantic_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    namespace TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    embedding TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_namespace "
+                "ON semantic_cache (namespace)"
+            )
+
+    def get(self, question: str) -> Optional[str]:
+        """
+        Look up a cached response for a semantically similar question
+
+        Args:
+            question: The user's question
+
+        Returns:
+            Cached response string, or None on a cache miss
+        """
+        try:
+            query_embedding = _embed_query(_normalize(question))
+            cutoff = time.time() - self.ttl
+
+            with sqlite3.connect(self.db_path) as conn:
+                # Expired entries are dropped eagerly so scans stay small
+                conn.execute(
+                    "DELETE FROM semantic_cache WHERE created_at < ?",
+                    (cutoff,)
+                )
+                rows = conn.execute(
+                    "SELECT embedding, response FROM semantic_cache "
+                    "WHERE namespace = ?",
+                    (self.namespace,)
+                ).fetchall()
+
+            best_similarity = 0.0
+            best_response = None
+            for embedding_json, response in rows:
+                similarity = self._cosine_similarity(
+                    query_embedding, json.loads(embedding_json)
+                )
+                if similarity > best_similarity:
+                    best_similarity = similarity
+                    best_response = response
+
+            if best_similarity >= self.similarity_threshold:
+                return best_response
+            return None
+        except Exception:
+            # Cache failures must never break the main ask() path
+            return None
+
+    def set(self, question: str, response: str):
+        """
+        Store a question/response pair in the cache
+
+        Args:
+            question: The user's question
+            response: The bot's response to cache
+        """
+        try:
+            embedding = _embed_query(_normalize(question))
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute(
+                    "INSERT INTO semantic_cache "
+                    "(namespace, question, embedding, response, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, question, json.dumps(embedding),
+                     response, time.time())
+                )
+        except Exception:
+            # Best-effort: a failed insert just means a future cache miss
+            pass
+
+    @staticmethod
+    def _cosine_similarity(a, b) -> float:
+        """Cosine similarity between two embedding vectors"""
+        dot = sum(x * y for x, y in zip(a, b))
+        norm_a = math.sqrt(sum(x * x for x in a))
+        norm_b = math.sqrt(sum(x * x for x in b))
+        if norm_a == 0 or norm_b == 0:
+            return 0.0
+        return dot / (norm_a * norm_b)
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Build a semantic cache namespaced to the configured Confluence site"""
+    namespace = os.getenv("CONFLUENCE_BASE_URL", "default")
+    ttl = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+    return SemanticCache(ttl=ttl, namespace=namespace)